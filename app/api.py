@@ -25,8 +25,12 @@ from core import (
     require_api_key
 )
 from services import ScheduleManager, VideoService
+from prewarm import Prewarmer, TimedFileResponse, first_byte_stats
+from integrity import MediaVerifier, STATUS_UNKNOWN
+from encoding import FORMAT_JSON, encoded_response, negotiate_format
 
-def setup_routes(app, schedule_manager: ScheduleManager, video_service: VideoService):
+def setup_routes(app, schedule_manager: ScheduleManager, video_service: VideoService,
+                 prewarmer: Prewarmer = None, verifier: MediaVerifier = None):
     # === Device Configured Status Endpoint ===
     @app.get("/api/device/configured")
     def device_configured():
@@ -152,35 +156,42 @@ def setup_routes(app, schedule_manager: ScheduleManager, video_service: VideoSer
     # ==== Obține următorul video ====
     @app.get("/next-video")
     def get_next_video():
+        started = time.perf_counter()
         video_path, video_type = video_service.get_next_video()
         
         if video_type == 'error':
             return JSONResponse(content={"error": "No scheduled content and no placeholder available."}, status_code=404)
         
+        warm = bool(prewarmer and prewarmer.is_warm(video_path))
         if video_type == 'placeholder':
-            return FileResponse(path=video_path, media_type="image/png")
+            return TimedFileResponse(video_path, media_type="image/png", started=started, warm=warm)
         elif video_type == 'campaign':
-            return FileResponse(path=video_path, media_type="video/mp4")
+            return TimedFileResponse(video_path, media_type="video/mp4", started=started, warm=warm)
         elif video_type == 'filler':
-            return FileResponse(path=video_path, media_type="video/mp4")
+            return TimedFileResponse(video_path, media_type="video/mp4", started=started, warm=warm)
         
         return JSONResponse(content={"error": "Unknown video type"}, status_code=500)
 
     # ==== Obține ID-ul videoclipului curent ====
     @app.get("/api/current-video-id")
-    def get_current_video_id():
+    def get_current_video_id(request: Request):
         video_info = video_service.get_current_video_info()
         
         if not video_info:
             return JSONResponse(content={"error": "No content loaded yet."}, status_code=404)
         
-        return video_info
+        return encoded_response(request, video_info)
 
 
     @app.get("/api/schedule-status")
-    def get_schedule_status():
-        schedule_manager.load_schedule()
-        schedule_manager.load_campaigns()
+    def get_schedule_status(request: Request, format: str = FORMAT_JSON):
+        schedule_manager.reload_if_changed()
+
+        # Compact / msgpack: columnar body shared by all clients until the current slot changes
+        fmt = negotiate_format(request, format)
+        if fmt != FORMAT_JSON:
+            key, build = schedule_manager.get_compact_status()
+            return encoded_response(request, build, fmt=fmt, cache_key=("schedule-status", key))
 
         current_time = datetime.now()
         is_valid_today = schedule_manager.is_schedule_for_today()
@@ -205,7 +216,7 @@ def setup_routes(app, schedule_manager: ScheduleManager, video_service: VideoSer
             delta = datetime.now() - schedule_manager.start_time
             time_since_start = int(delta.total_seconds())
 
-        return {
+        return encoded_response(request, {
             "schedule_date": schedule_manager.schedule.get('date', 'N/A'),
             "is_valid_for_today": is_valid_today,
             "current_time": current_time.strftime('%H:%M:%S'),
@@ -221,20 +232,23 @@ def setup_routes(app, schedule_manager: ScheduleManager, video_service: VideoSer
                 "filename": last_served_video["path"].name if last_served_video and last_served_video.get("path") and hasattr(last_served_video["path"], 'name') else None,
                 "scheduled": last_served_video.get("info", {}).get("scheduled", False) if last_served_video else False
             } if last_served_video else None
-        }
+        })
 
 
     # ==== Campaign status endpoint ====
     @app.get("/api/campaign-status")
-    def get_campaign_status():
+    def get_campaign_status(request: Request):
         """Get current campaign status and statistics"""
-        schedule_manager.load_campaigns()
+        schedule_manager.reload_if_changed()
         
         campaigns_info = []
         for campaign_id, campaign in schedule_manager.campaigns.items():
             # Check if video file exists
             video_file = campaign.get('video_file', '')
             video_exists = (VIDEO_CAMPAIGN_DIR / video_file).exists() if video_file else False
+            video_integrity = STATUS_UNKNOWN
+            if verifier and video_file:
+                video_integrity = verifier.get_status(VIDEO_CAMPAIGN_DIR / video_file)
             
             campaign_info = {
                 "id": campaign_id,
@@ -242,15 +256,32 @@ def setup_routes(app, schedule_manager: ScheduleManager, video_service: VideoSer
                 "plays_today": campaign_plays_today.get(campaign_id, 0),
                 "plays_this_hour": campaign_plays_hour.get(campaign_id, 0),
                 "video_exists": video_exists,
+                "video_integrity": video_integrity,
                 "video_file": video_file
             }
             campaigns_info.append(campaign_info)
         
-        return {
+        return encoded_response(request, {
             "campaigns": campaigns_info,
             "current_time": datetime.now().isoformat(),
             "total_campaigns": len(schedule_manager.campaigns)
-        }
+        })
+
+    # ==== Media integrity ====
+    @app.get("/api/media-integrity")
+    def get_media_integrity(request: Request):
+        """Verification state of every campaign and filler file, plus quarantined files"""
+        if not verifier:
+            return {"enabled": False}
+        return encoded_response(request, {"enabled": True, **verifier.summary()})
+
+    # ==== Prewarm / first-byte latency ====
+    @app.get("/api/prewarm-status")
+    def get_prewarm_status(request: Request):
+        """Prewarmer state and cold vs warm first-byte latency per served item"""
+        if prewarmer:
+            return encoded_response(request, prewarmer.status())
+        return encoded_response(request, {"running": False, "first_byte": first_byte_stats.snapshot()})
 
     # ==== Manual reload endpoints ====
     @app.post("/api/reload-schedule")
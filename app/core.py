@@ -59,9 +59,12 @@ def require_api_key(x_api_key: str = Header(...)):
     return hash_api_key(x_api_key) == stored_hash
 config: dict = {}
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Configure logging (background queue, JSON records, per-slot rate limiting)
+from logs import HOT_PATH_LOGGER_NAME, setup_logging
+setup_logging()
 logger = logging.getLogger(__name__)
+# Per-request logging; its verbosity is set separately via hot_path_log_level
+hot_logger = logging.getLogger(HOT_PATH_LOGGER_NAME)
 
 
 # ==== Directoare și fișiere ====
@@ -76,6 +79,9 @@ PLACEHOLDER_IMAGE_PATH = BASE_DIR / "data" / "placeholder.png"
 CONFIG_PATH = BASE_DIR / "config.json"
 DEVICE_CONFIG_PATH = CONFIG_PATH
 HEARTBEAT_PATH = BASE_DIR / "data" / "heartbeat.json"
+FILLER_STATE_PATH = BASE_DIR / "data" / "filler_state.json"
+MEDIA_HASH_CACHE_PATH = BASE_DIR / "data" / "media_hashes.json"
+QUARANTINE_DIR = BASE_DIR / "data" / "video" / "quarantine"
 
 # ==== Variabile globale ====
 video_files = []
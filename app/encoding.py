@@ -0,0 +1,144 @@
+import gzip
+import json
+import threading
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+
+# brotli and msgpack are optional; without them responses fall back to gzip / JSON
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# ==== Setări implicite ====
+MIN_COMPRESS_BYTES = 512
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+# Cached bodies are compressed once and served many times, so spend more CPU on them
+CACHED_GZIP_LEVEL = 9
+CACHED_BROTLI_QUALITY = 9
+CACHE_ENTRIES = 32
+
+FORMAT_JSON = "json"
+FORMAT_COMPACT = "compact"
+FORMAT_MSGPACK = "msgpack"
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+
+
+def negotiate_format(request: Request, requested: Optional[str] = None) -> str:
+    """Pick json, compact (columnar JSON) or msgpack from ?format= or the Accept header"""
+    requested = (requested or "").lower()
+    accept = request.headers.get("accept", "").lower()
+    if requested == FORMAT_MSGPACK or any(t in accept for t in MSGPACK_MEDIA_TYPES):
+        return FORMAT_MSGPACK if msgpack else FORMAT_COMPACT
+    if requested == FORMAT_COMPACT:
+        return FORMAT_COMPACT
+    return FORMAT_JSON
+
+
+def negotiate_encoding(request: Request) -> str:
+    """Pick br, gzip or identity from Accept-Encoding (honouring q=0)"""
+    offered = {}
+    for part in request.headers.get("accept-encoding", "").split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        offered[name.strip().lower()] = q
+    wildcard = offered.get("*", 0.0)
+    if brotli and offered.get("br", wildcard) > 0:
+        return "br"
+    if offered.get("gzip", wildcard) > 0:
+        return "gzip"
+    return "identity"
+
+
+def serialize(payload, fmt: str) -> bytes:
+    if fmt == FORMAT_MSGPACK:
+        return msgpack.packb(payload, use_bin_type=True, default=str)
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+
+def compress(body: bytes, encoding: str, cached: bool = False) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=CACHED_BROTLI_QUALITY if cached else BROTLI_QUALITY)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=CACHED_GZIP_LEVEL if cached else GZIP_LEVEL, mtime=0)
+    return body
+
+
+class EncodedBodyCache:
+    """Small LRU of serialized bodies and their compressed variants.
+
+    Lets every client that polls the same state get the same precomputed
+    bytes instead of re-serializing and re-compressing per request.
+    """
+
+    def __init__(self, max_entries: int = CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, payload, fmt: str, encoding: str) -> bytes:
+        with self._lock:
+            variants = self._entries.get(key)
+            if variants is not None:
+                self._entries.move_to_end(key)
+                body = variants.get(encoding)
+                if body is not None:
+                    return body
+        if variants is None:
+            variants = {"identity": serialize(payload() if callable(payload) else payload, fmt)}
+        identity = variants["identity"]
+        body = compress(identity, encoding, cached=True) if encoding != "identity" else identity
+        with self._lock:
+            variants = self._entries.setdefault(key, variants)
+            variants.setdefault(encoding, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return body
+
+
+body_cache = EncodedBodyCache()
+
+
+def encoded_response(request: Request, payload, fmt: str = FORMAT_JSON,
+                     cache_key: Optional[Hashable] = None, status_code: int = 200) -> Response:
+    """Serialize payload in the chosen format and compress it per Accept-Encoding.
+
+    With a cache_key the body is taken from (or stored in) body_cache; payload
+    may then be a callable so it is only built on a cache miss.
+    """
+    media_type = "application/msgpack" if fmt == FORMAT_MSGPACK else "application/json"
+    encoding = negotiate_encoding(request)
+
+    if cache_key is not None:
+        identity = body_cache.get((cache_key, fmt), payload, fmt, "identity")
+        if len(identity) < MIN_COMPRESS_BYTES:
+            encoding = "identity"
+        body = body_cache.get((cache_key, fmt), payload, fmt, encoding)
+    else:
+        body = serialize(payload() if callable(payload) else payload, fmt)
+        if len(body) < MIN_COMPRESS_BYTES:
+            encoding = "identity"
+        body = compress(body, encoding)
+
+    headers = {"Vary": "Accept-Encoding, Accept"}
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, status_code=status_code, media_type=media_type, headers=headers)
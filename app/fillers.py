@@ -0,0 +1,252 @@
+import heapq
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from core import logger
+
+# How many of the most-due fillers are considered when fitting the remaining slot time.
+# Keeps each pick at O(k log n) regardless of library size.
+FIT_CANDIDATES = 8
+# Duration fit only chooses among fillers whose due time is within this much of the
+# most overdue one (a weight-1 filler advances by 1.0 per play), so it acts as a
+# tie-break and never overrides the rotation order.
+FIT_WINDOW = 0.5
+# Rotation state is written at most this often while playing, so a power cut loses little
+STATE_SAVE_INTERVAL = 30.0
+
+
+class FillerEntry:
+    __slots__ = ("path", "weight", "duration", "due")
+
+    def __init__(self, path: Path, weight: float = 1.0, duration: Optional[float] = None, due: float = 0.0):
+        self.path = path
+        self.weight = weight
+        self.duration = duration
+        self.due = due
+
+
+class FillerRotation:
+    """Weighted least-recently-played filler selection.
+
+    Every filler has a virtual "due" time; playing it pushes the due time
+    forward by 1/weight, so over time each filler's share of plays is
+    proportional to its weight. The exception is that the same filler is never
+    picked twice in a row while another one is available, which caps a
+    heavily weighted filler at every other play. When the remaining slot time
+    is known, the filler that fits it best is chosen among those within
+    FIT_WINDOW of the lowest due time. The fillers live in a min-heap keyed by
+    (due, name) with lazy deletion, so picks and updates are O(log n).
+    """
+
+    def __init__(self, directory: Path, state_path: Optional[Path] = None, pattern: str = "*.mp4"):
+        self.directory = directory
+        self.state_path = state_path
+        self.pattern = pattern
+        self.entries: Dict[str, FillerEntry] = {}
+        self.by_stem: Dict[str, str] = {}
+        self.last_played: Optional[str] = None
+        self._heap: List[tuple] = []
+        self._vtime = 0.0
+        self._dir_mtime = -1
+        self._metadata_sig = None
+        self._last_save = time.monotonic()
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self.load_state()
+
+    # ==== Library ====
+    def refresh(self, metadata: Optional[dict] = None):
+        """Rescan the filler directory only if it or the filler metadata changed"""
+        try:
+            dir_mtime = self.directory.stat().st_mtime_ns
+        except OSError:
+            dir_mtime = None
+
+        with self._lock:
+            # The filler metadata is a handful of entries, so compare it on every call
+            sig = self._filler_metadata(metadata) if metadata is not None else self._metadata_sig
+            if dir_mtime == self._dir_mtime and sig == self._metadata_sig:
+                return
+            self._dir_mtime = dir_mtime
+            self._metadata_sig = sig
+            self._rebuild(sig or {})
+
+    @staticmethod
+    def _filler_metadata(campaigns: dict) -> Dict[str, tuple]:
+        """Extract (weight, duration) for filler entries in campaigns.json, keyed by file name"""
+        meta = {}
+        for item_id, item in campaigns.items():
+            if item.get('file_type') != 'filler':
+                continue
+            weight = item.get('weight', 1)
+            duration = item.get('duration')
+            video_file = item.get('video_file') or f"{item_id}.mp4"
+            meta[video_file] = (weight, duration)
+            meta.setdefault(f"{item_id}.mp4", (weight, duration))
+        return meta
+
+    def _rebuild(self, meta: Dict[str, tuple]):
+        files = sorted(self.directory.glob(self.pattern)) if self.directory.exists() else []
+        entries = {}
+        for path in files:
+            weight, duration = meta.get(path.name, (1, None))
+            try:
+                weight = float(weight)
+            except (TypeError, ValueError):
+                weight = 1.0
+            if not math.isfinite(weight) or weight <= 0:
+                logger.warning(f"[FILLER-ROTATION] Ignoring {path.name}: invalid weight {weight}")
+                continue
+            duration = self._parse_duration(duration)
+            old = self.entries.get(path.name)
+            due = old.due if old else self._vtime
+            entries[path.name] = FillerEntry(path, weight, duration, due)
+
+        self.entries = entries
+        self.by_stem = {entry.path.stem: name for name, entry in entries.items()}
+        self._heap = [(entry.due, name) for name, entry in entries.items()]
+        heapq.heapify(self._heap)
+        logger.info(f"[FILLER-ROTATION] {len(entries)} fillers in rotation")
+
+    @staticmethod
+    def _parse_duration(value) -> Optional[float]:
+        """Duration in seconds, or None if missing or not a positive number"""
+        try:
+            duration = float(value)
+        except (TypeError, ValueError):
+            return None
+        return duration if math.isfinite(duration) and duration > 0 else None
+
+    def find(self, item_id: str) -> Optional[Path]:
+        """Look up a filler by id (file stem) or file name"""
+        name = self.by_stem.get(item_id) or (item_id if item_id in self.entries else None)
+        return self.entries[name].path if name else None
+
+    def __len__(self):
+        return len(self.entries)
+
+    # ==== Selection ====
+    def mark_played(self, path: Path):
+        """Record a play of a filler served outside of pick() (e.g. a scheduled filler)"""
+        with self._lock:
+            if path.name in self.entries:
+                self._advance(path.name)
+        self._save_if_due()
+
+    def pick(self, remaining: Optional[float] = None,
+             skip: Optional[Callable[[Path], bool]] = None) -> Optional[Path]:
+        """Pick the next filler, preferring one that fits in `remaining` seconds.
+
+        Fillers for which `skip(path)` is true (e.g. known-corrupt files) are never chosen.
+        """
+        with self._lock:
+            candidates = []
+            pool = []
+            fresh_due = None
+            while self._heap and len(pool) < FIT_CANDIDATES:
+                due, name = heapq.heappop(self._heap)
+                entry = self.entries.get(name)
+                if entry is None or entry.due != due:
+                    continue  # stale heap entry
+                candidates.append(entry)
+                if skip and skip(entry.path):
+                    continue
+                pool.append(entry)
+                if name == self.last_played:
+                    continue
+                if fresh_due is None:
+                    fresh_due = due
+                    if remaining is None:
+                        break
+                elif due > fresh_due + FIT_WINDOW:
+                    break
+
+            chosen = self._choose(pool, remaining) if pool else None
+            for entry in candidates:
+                if entry is not chosen:
+                    heapq.heappush(self._heap, (entry.due, entry.path.name))
+            if chosen is None:
+                return None
+            # Candidates come off the heap in due order, so pool[0] is the most overdue filler
+            self._vtime = max(self._vtime, pool[0].due)
+            self._advance(chosen.path.name)
+        self._save_if_due()
+        return chosen.path
+
+    def _choose(self, candidates: List[FillerEntry], remaining: Optional[float]) -> FillerEntry:
+        pool = [c for c in candidates if c.path.name != self.last_played] or candidates
+        pool = [c for c in pool if c.due <= pool[0].due + FIT_WINDOW]
+        if remaining is None:
+            return pool[0]
+
+        def fit_key(indexed):
+            index, entry = indexed
+            if entry.duration is None:
+                return (1, 0, index)
+            leftover = remaining - entry.duration
+            if leftover >= 0:
+                return (0, leftover, index)
+            return (2, 0, index)
+
+        return min(enumerate(pool), key=fit_key)[1]
+
+    def _advance(self, name: str):
+        entry = self.entries[name]
+        # Fillers that sat out (e.g. skipped as corrupt) resume at the current virtual time
+        # instead of catching up with a burst of plays
+        entry.due = max(entry.due, self._vtime) + 1.0 / entry.weight
+        heapq.heappush(self._heap, (entry.due, name))
+        self.last_played = name
+        # Drop stale entries once they outnumber live ones
+        if len(self._heap) > 2 * len(self.entries) + 16:
+            self._heap = [(e.due, n) for n, e in self.entries.items()]
+            heapq.heapify(self._heap)
+
+    # ==== Persistence ====
+    def load_state(self):
+        """Restore due times saved by save_state() so the rotation survives restarts"""
+        if not self.state_path or not self.state_path.exists():
+            return
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self._vtime = float(data.get('vtime', 0.0))
+            self.last_played = data.get('last_played')
+            for name, due in data.get('due', {}).items():
+                self.entries[name] = FillerEntry(self.directory / name, due=float(due))
+        except Exception as e:
+            logger.warning(f"[FILLER-ROTATION] Could not load rotation state: {e}")
+
+    def _save_if_due(self):
+        if self.state_path and time.monotonic() - self._last_save >= STATE_SAVE_INTERVAL:
+            self.save_state()
+
+    def save_state(self):
+        """Write the due times atomically (temp file + rename); called after plays and on shutdown"""
+        if not self.state_path:
+            return
+        with self._save_lock:
+            with self._lock:
+                data = {
+                    'vtime': self._vtime,
+                    'last_played': self.last_played,
+                    'due': {name: entry.due for name, entry in self.entries.items()},
+                }
+            self._last_save = time.monotonic()
+            tmp = None
+            try:
+                with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=self.state_path.parent,
+                                                 suffix=".tmp", delete=False) as f:
+                    tmp = f.name
+                    json.dump(data, f, indent=2)
+                os.replace(tmp, self.state_path)
+            except Exception as e:
+                logger.warning(f"[FILLER-ROTATION] Could not save rotation state: {e}")
+                if tmp and os.path.exists(tmp):
+                    os.remove(tmp)
@@ -0,0 +1,311 @@
+import hashlib
+import json
+import os
+import shutil
+import struct
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from core import logger
+
+# ==== Setări implicite ====
+VERIFY_WORKERS = 2
+SCAN_INTERVAL_SECONDS = 30.0
+# Files modified more recently than this are assumed to still be copying
+SETTLE_SECONDS = 10.0
+HASH_CHUNK = 1024 * 1024
+# Bump when the verification rules change so cached results are checked again
+CACHE_VERSION = 2
+
+STATUS_OK = "ok"
+STATUS_BAD = "bad"
+STATUS_PENDING = "pending"
+STATUS_QUARANTINED = "quarantined"
+STATUS_UNKNOWN = "unknown"
+
+
+def check_mp4_structure(path: Path) -> Optional[str]:
+    """Walk the top-level MP4 boxes; return a reason string if the file is truncated or has no moov"""
+    try:
+        file_size = path.stat().st_size
+        seen = set()
+        offset = 0
+        with open(path, 'rb') as f:
+            while offset < file_size:
+                f.seek(offset)
+                header = f.read(8)
+                if len(header) < 8:
+                    # Trailing padding too short to be a box; let the moov check decide
+                    break
+                size, box_type = struct.unpack(">I4s", header)
+                if size == 1:
+                    large = f.read(8)
+                    if len(large) < 8:
+                        break
+                    size = struct.unpack(">Q", large)[0]
+                elif size == 0:
+                    size = file_size - offset
+                if size < 8:
+                    # Can't walk past this; whether the file is usable is decided by moov below
+                    break
+                if offset + size > file_size:
+                    return f"'{box_type.decode('latin-1')}' box runs past end of file (truncated)"
+                # No ordering rules: QuickTime files may start with wide/free/skip before ftyp
+                seen.add(box_type)
+                offset += size
+        if b"moov" not in seen:
+            return "missing moov box"
+        return None
+    except OSError as e:
+        return f"unreadable: {e}"
+
+
+def hash_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while chunk := f.read(HASH_CHUNK):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class MediaVerifier:
+    """Background integrity checker for campaign and filler media.
+
+    A scanner thread stats the media directories and hands new or changed
+    files to a thread pool that checks the MP4 box structure and computes a
+    SHA-256 (compared against ``video_sha256`` in campaigns.json when set).
+    Results are cached by (inode, size, mtime) and persisted, so unchanged
+    files are never hashed twice. Bad files are moved to the quarantine dir.
+    """
+
+    def __init__(self, directories: List[Path], cache_path: Optional[Path] = None,
+                 quarantine_dir: Optional[Path] = None,
+                 expected_hashes: Optional[Callable[[], Dict[str, str]]] = None,
+                 workers: int = VERIFY_WORKERS, interval: float = SCAN_INTERVAL_SECONDS):
+        self.directories = directories
+        self.cache_path = cache_path
+        self.quarantine_dir = quarantine_dir
+        self.expected_hashes = expected_hashes or (lambda: {})
+        self.workers = workers
+        self.interval = interval
+        # str(path) -> {"key": [ino, size, mtime_ns], "sha256": ..., "reason": ...}
+        self.cache: Dict[str, dict] = {}
+        self.status: Dict[str, dict] = {}
+        self.quarantined: Dict[str, dict] = {}
+        self._bad: set = set()
+        self._in_flight: set = set()
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self.load_cache()
+
+    # ==== Hot path ====
+    def is_bad(self, path: Path) -> bool:
+        """True if the file is known to be corrupt or was quarantined"""
+        return str(path) in self._bad
+
+    def get_status(self, path: Path) -> str:
+        key = str(path)
+        if key in self.quarantined:
+            return STATUS_QUARANTINED
+        entry = self.status.get(key)
+        return entry["status"] if entry else STATUS_UNKNOWN
+
+    # ==== Background ====
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="verifier")
+        self._thread = threading.Thread(target=self._run, name="media-verifier", daemon=True)
+        self._thread.start()
+        logger.info(f"[INTEGRITY] Verifier started with {self.workers} workers")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+        if self._pool:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+        self.save_cache()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.scan()
+            except Exception as e:
+                logger.error(f"[INTEGRITY] Scan failed: {e}")
+            self._stop.wait(self.interval)
+
+    def scan(self):
+        """Verify every new or changed media file and persist the results once at the end"""
+        expected = self.expected_hashes()
+        now = time.time()
+        present = set()
+        futures = []
+        for directory in self.directories:
+            if not directory.exists():
+                continue
+            for path in directory.glob("*.mp4"):
+                key = str(path)
+                present.add(key)
+                try:
+                    st = path.stat()
+                except OSError:
+                    continue
+                file_key = [st.st_ino, st.st_size, st.st_mtime_ns]
+                cached = self.cache.get(key)
+                if cached and cached["key"] == file_key:
+                    self._apply(path, cached, expected.get(path.name))
+                    continue
+                if now - st.st_mtime < SETTLE_SECONDS:
+                    self._set_status(path, STATUS_PENDING, "file recently modified")
+                    continue
+                with self._lock:
+                    if key in self._in_flight:
+                        continue
+                    self._in_flight.add(key)
+                if self._pool:
+                    futures.append(self._pool.submit(self._verify, path, file_key, expected.get(path.name)))
+                else:
+                    self._verify(path, file_key, expected.get(path.name))
+
+        with self._lock:
+            for key in [k for k in self.cache if k not in present]:
+                del self.cache[key]
+                self._dirty = True
+            for key in [k for k in self.status if k not in present]:
+                del self.status[key]
+                if key not in self.quarantined:
+                    self._bad.discard(key)
+
+        # Wait for this scan's workers, then write the cache once from this thread
+        wait(futures)
+        self.save_cache()
+
+    def _verify(self, path: Path, file_key: list, expected: Optional[str]):
+        try:
+            reason = check_mp4_structure(path)
+            sha256 = hash_file(path)
+            entry = {"key": file_key, "sha256": sha256, "reason": reason}
+            with self._lock:
+                self.cache[str(path)] = entry
+                self._dirty = True
+            self._apply(path, entry, expected)
+        except OSError as e:
+            # File vanished or is unreadable; retry on the next scan
+            logger.warning(f"[INTEGRITY] Could not verify {path.name}: {e}")
+        finally:
+            with self._lock:
+                self._in_flight.discard(str(path))
+
+    def _apply(self, path: Path, entry: dict, expected: Optional[str]):
+        reason = entry.get("reason")
+        if not reason and expected and expected.lower() != entry["sha256"]:
+            reason = "sha256 mismatch"
+        if reason:
+            self._set_status(path, STATUS_BAD, reason, entry["sha256"])
+            self._quarantine(path, reason)
+        else:
+            self._set_status(path, STATUS_OK, None, entry["sha256"])
+
+    def _set_status(self, path: Path, status: str, reason: Optional[str], sha256: Optional[str] = None):
+        key = str(path)
+        with self._lock:
+            previous = self.status.get(key, {}).get("status")
+            self.status[key] = {
+                "status": status,
+                "reason": reason,
+                "sha256": sha256,
+                "checked_at": datetime.now().isoformat(timespec="seconds"),
+            }
+            if status == STATUS_BAD:
+                self._bad.add(key)
+            elif status == STATUS_OK:
+                self._bad.discard(key)
+                self.quarantined.pop(key, None)
+        if status == STATUS_BAD and previous != STATUS_BAD:
+            logger.error(f"[INTEGRITY] {path.name} failed verification: {reason}")
+
+    def _quarantine(self, path: Path, reason: str):
+        if not self.quarantine_dir:
+            return
+        try:
+            self.quarantine_dir.mkdir(parents=True, exist_ok=True)
+            target = self.quarantine_dir / f"{path.stem}.{int(time.time())}{path.suffix}"
+            shutil.move(str(path), str(target))
+        except OSError as e:
+            logger.error(f"[INTEGRITY] Could not quarantine {path.name}: {e}")
+            return
+        key = str(path)
+        with self._lock:
+            self.quarantined[key] = {"reason": reason, "moved_to": str(target),
+                                     "at": datetime.now().isoformat(timespec="seconds")}
+            self.status.pop(key, None)
+            self.cache.pop(key, None)
+            self._bad.add(key)
+            self._dirty = True
+        logger.warning(f"[INTEGRITY] Quarantined {path.name} → {target}")
+
+    def summary(self) -> dict:
+        with self._lock:
+            files = {Path(k).name: dict(v) for k, v in self.status.items()}
+            quarantined = {Path(k).name: dict(v) for k, v in self.quarantined.items()}
+        counts: Dict[str, int] = {}
+        for info in files.values():
+            counts[info["status"]] = counts.get(info["status"], 0) + 1
+        if quarantined:
+            counts[STATUS_QUARANTINED] = len(quarantined)
+        return {"counts": counts, "files": files, "quarantined": quarantined}
+
+    # ==== Persistence ====
+    def load_cache(self):
+        if not self.cache_path or not self.cache_path.exists():
+            return
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("version") == CACHE_VERSION:
+                self.cache = data.get("files", {})
+            else:
+                # Verified under older rules; check everything again
+                self._dirty = True
+            self.quarantined = data.get("quarantined", {})
+            self._bad.update(self.quarantined)
+        except Exception as e:
+            logger.warning(f"[INTEGRITY] Could not load hash cache: {e}")
+
+    def save_cache(self):
+        if not self.cache_path:
+            return
+        # stop() may save while the scanner is still finishing; one writer at a time
+        with self._save_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                data = {"version": CACHE_VERSION, "files": dict(self.cache),
+                        "quarantined": dict(self.quarantined)}
+                self._dirty = False
+            tmp = None
+            try:
+                with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=self.cache_path.parent,
+                                                 suffix=".tmp", delete=False) as f:
+                    tmp = f.name
+                    json.dump(data, f, indent=2)
+                os.replace(tmp, self.cache_path)
+            except OSError as e:
+                logger.warning(f"[INTEGRITY] Could not save hash cache: {e}")
+                if tmp and os.path.exists(tmp):
+                    os.remove(tmp)
+                with self._lock:
+                    self._dirty = True
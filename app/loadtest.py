@@ -0,0 +1,503 @@
+"""Load generator that simulates many player screens against the app.
+
+Each simulated player follows static/js/script.js: it fetches /next-video at
+every slot boundary (1s after the previous clip ends, re-asking every second
+while it gets the placeholder image), polls /api/campaign-status,
+/api/schedule-status and /api/current-video-id every 30 seconds and
+occasionally opens the dashboard (/api/schedule-status).
+
+By default a server is started on a free port from a throwaway copy of the
+app with synthetic media and a relative schedule, so the run works offline
+and never touches the real data directory:
+
+    python loadtest.py --players 200 --duration 120
+    python loadtest.py --target http://127.0.0.1:8000 --players 50
+    python loadtest.py --compare loadtest_results/a.json loadtest_results/b.json
+"""
+import argparse
+import asyncio
+import gzip
+import json
+import math
+import random
+import shutil
+import socket
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+# brotli is optional; without it the players only offer gzip/deflate
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+BASE_DIR = Path(__file__).parent
+RESULTS_DIR = BASE_DIR / "loadtest_results"
+
+STATUS_POLL_SECONDS = 30.0
+PLACEHOLDER_RETRY_SECONDS = 1.0
+VIDEO_END_DELAY_SECONDS = 1.0
+PERCENTILES = (50, 90, 95, 99)
+# What a browser's fetch() sends, so the server compresses API responses as in production
+API_HEADERS = {"Accept-Encoding": "gzip, deflate, br" if brotli else "gzip, deflate"}
+
+
+# ==== Date sintetice ====
+def generate_synthetic_data(data_dir: Path, slots: int, slot_seconds: int, campaigns: int = 4,
+                            fillers: int = 6, media_bytes: int = 2 * 1024 * 1024, seed: int = 0):
+    """Write fake MP4s, campaigns.json and a relative schedule.json into data_dir"""
+    rng = random.Random(seed)
+    campaign_dir = data_dir / "video" / "campaigns"
+    filler_dir = data_dir / "video" / "filler"
+    for d in (campaign_dir, filler_dir, data_dir / "audio" / "campaigns", data_dir / "audio" / "filler"):
+        d.mkdir(parents=True, exist_ok=True)
+
+    def write_media(path: Path):
+        # Minimal ftyp/moov/mdat box layout so the files pass integrity checks;
+        # random payload so nothing along the way can compress it away
+        ftyp = struct.pack(">I4s4sI4s", 20, b"ftyp", b"isom", 512, b"isom")
+        moov = struct.pack(">I4s", 8, b"moov")
+        payload = rng.randbytes(max(media_bytes - len(ftyp) - len(moov) - 8, 0))
+        with open(path, "wb") as f:
+            f.write(ftyp + moov + struct.pack(">I4s", len(payload) + 8, b"mdat") + payload)
+
+    campaign_entries = []
+    for i in range(campaigns):
+        campaign_id = f"campaign_{i}"
+        write_media(campaign_dir / f"{campaign_id}.mp4")
+        campaign_entries.append({
+            "id": campaign_id,
+            "version": "0",
+            "file_type": "campaign",
+            "name": f"Synthetic Campaign {i}",
+            "video_file": f"{campaign_id}.mp4",
+            "constraints": {"plays_per_hour": 60},
+        })
+    for i in range(fillers):
+        write_media(filler_dir / f"filler_{i}.mp4")
+
+    playlist = []
+    for i in range(slots):
+        offset = i * slot_seconds
+        at = f"{offset // 3600:02d}:{offset % 3600 // 60:02d}:{offset % 60:02d}"
+        if i % 2 == 0 and campaigns:
+            playlist.append({"at": at, "id": f"campaign_{rng.randrange(campaigns)}", "type": "campaign",
+                             "duration": slot_seconds})
+        else:
+            playlist.append({"at": at, "id": f"filler_{rng.randrange(max(fillers, 1))}", "type": "filler",
+                             "duration": slot_seconds})
+
+    with open(data_dir / "campaigns.json", "w", encoding="utf-8") as f:
+        json.dump({"version": datetime.now().isoformat(), "campaigns": campaign_entries}, f, indent=2)
+    with open(data_dir / "schedule.json", "w", encoding="utf-8") as f:
+        json.dump({
+            "file_type": "schedule",
+            "date": datetime.now().strftime("%d-%m-%Y"),
+            "version": "0",
+            "relative": True,
+            "timezone": "Europe/Bucharest",
+            "playlist": playlist,
+        }, f, indent=2)
+
+
+def prepare_sandbox(args) -> Path:
+    """Copy the app code into a temp dir and fill it with synthetic data"""
+    sandbox = Path(tempfile.mkdtemp(prefix="campaign-loadtest-"))
+    for path in BASE_DIR.glob("*.py"):
+        shutil.copy2(path, sandbox / path.name)
+    shutil.copytree(BASE_DIR / "static", sandbox / "static")
+    shutil.copytree(BASE_DIR / "templates", sandbox / "templates")
+    (sandbox / "data").mkdir()
+    shutil.copy2(BASE_DIR / "data" / "placeholder.png", sandbox / "data" / "placeholder.png")
+
+    slots = int(args.duration // args.slot_seconds) + 2
+    generate_synthetic_data(sandbox / "data", slots, args.slot_seconds, campaigns=args.campaigns,
+                            fillers=args.fillers, media_bytes=args.media_kb * 1024, seed=args.seed)
+    return sandbox
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(sandbox: Path, port: int) -> subprocess.Popen:
+    log = open(sandbox / "server.log", "wb")
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=sandbox, stdout=log, stderr=subprocess.STDOUT,
+    )
+
+
+# ==== Client HTTP minimal (keep-alive) ====
+class HttpConnection:
+    """Tiny HTTP/1.1 keep-alive client; bodies are counted and discarded unless keep_body is set"""
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+
+    async def close(self):
+        if self.writer:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except Exception:
+                pass
+        self.reader = self.writer = None
+
+    async def get(self, path: str, headers: Optional[Dict[str, str]] = None,
+                  keep_body: bool = False) -> Tuple[int, Dict[str, str], int, bytes]:
+        for attempt in (0, 1):
+            if self.writer is None:
+                self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+            try:
+                lines = [f"GET {path} HTTP/1.1", f"Host: {self.host}:{self.port}"]
+                lines += [f"{k}: {v}" for k, v in (headers or {}).items()]
+                self.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+                await self.writer.drain()
+                return await self._read_response(keep_body)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                # Server closed an idle keep-alive connection; retry once on a fresh one
+                await self.close()
+                if attempt:
+                    raise
+
+    async def _read_response(self, keep_body: bool) -> Tuple[int, Dict[str, str], int, bytes]:
+        head = await self.reader.readuntil(b"\r\n\r\n")
+        status_line, *header_lines = head.decode("latin-1").split("\r\n")
+        status = int(status_line.split(" ", 2)[1])
+        headers = {}
+        for line in header_lines:
+            if ":" in line:
+                k, v = line.split(":", 1)
+                headers[k.strip().lower()] = v.strip()
+
+        size = 0
+        body = bytearray()
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            while True:
+                chunk_len = int((await self.reader.readline()).split(b";")[0], 16)
+                chunk = await self.reader.readexactly(chunk_len + 2)
+                size += chunk_len
+                if keep_body:
+                    body += chunk[:-2]
+                if chunk_len == 0:
+                    break
+        elif "content-length" in headers:
+            remaining = int(headers["content-length"])
+            while remaining:
+                chunk = await self.reader.read(min(remaining, 256 * 1024))
+                if not chunk:
+                    raise asyncio.IncompleteReadError(b"", remaining)
+                remaining -= len(chunk)
+                size += len(chunk)
+                if keep_body:
+                    body += chunk
+        else:
+            while chunk := await self.reader.read(256 * 1024):
+                size += len(chunk)
+                if keep_body:
+                    body += chunk
+            await self.close()
+
+        if headers.get("connection", "").lower() == "close":
+            await self.close()
+        return status, headers, size, bytes(body)
+
+
+def decode_body(body: bytes, headers: Dict[str, str]) -> bytes:
+    encoding = headers.get("content-encoding", "identity").lower()
+    if encoding == "gzip":
+        return gzip.decompress(body)
+    if encoding == "deflate":
+        return zlib.decompress(body)
+    if encoding == "br" and brotli:
+        return brotli.decompress(body)
+    return body
+
+
+# ==== Statistici ====
+class EndpointStats:
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.errors = 0
+        self.bytes = 0
+
+    def add(self, seconds: float, nbytes: int, ok: bool):
+        self.latencies.append(seconds)
+        self.bytes += nbytes
+        if not ok:
+            self.errors += 1
+
+    def summary(self, elapsed: float) -> dict:
+        count = len(self.latencies)
+        ordered = sorted(self.latencies)
+
+        def pct(p):
+            if not ordered:
+                return None
+            # Nearest-rank percentile
+            index = min(len(ordered) - 1, max(0, math.ceil(p / 100 * len(ordered)) - 1))
+            return round(ordered[index] * 1000, 2)
+
+        result = {
+            "requests": count,
+            "errors": self.errors,
+            "error_rate": round(self.errors / count, 4) if count else 0.0,
+            "throughput_rps": round(count / elapsed, 2) if elapsed else 0.0,
+            "bytes": self.bytes,
+            "mean_ms": round(sum(ordered) / count * 1000, 2) if count else None,
+            "max_ms": round(ordered[-1] * 1000, 2) if count else None,
+        }
+        for p in PERCENTILES:
+            result[f"p{p}_ms"] = pct(p)
+        return result
+
+
+class Recorder:
+    def __init__(self):
+        self.endpoints: Dict[str, EndpointStats] = {}
+
+    def add(self, endpoint: str, seconds: float, nbytes: int, ok: bool):
+        self.endpoints.setdefault(endpoint, EndpointStats()).add(seconds, nbytes, ok)
+
+
+# ==== Player simulat ====
+def parse_clock(value: str) -> int:
+    """'HH:MM:SS' -> seconds"""
+    h, m, s = (int(x) for x in value.split(":"))
+    return h * 3600 + m * 60 + s
+
+
+class SimulatedPlayer:
+    def __init__(self, index: int, host: str, port: int, recorder: Recorder, deadline: float,
+                 dashboard_ratio: float, rng: random.Random):
+        self.index = index
+        self.recorder = recorder
+        self.deadline = deadline
+        self.dashboard_ratio = dashboard_ratio
+        self.rng = rng
+        # Browsers use separate connections for the media and the API polling
+        self.media = HttpConnection(host, port)
+        self.api = HttpConnection(host, port)
+        self.slot_offsets: List[int] = []
+        self.server_start: Optional[float] = None
+
+    async def fetch(self, conn: HttpConnection, path: str, headers: Optional[Dict[str, str]] = None):
+        endpoint = path.split("?", 1)[0]
+        started = time.perf_counter()
+        try:
+            status, resp_headers, size, _ = await conn.get(path, headers)
+        except Exception:
+            self.recorder.add(endpoint, time.perf_counter() - started, 0, False)
+            await conn.close()
+            return None
+        self.recorder.add(endpoint, time.perf_counter() - started, size, status < 400)
+        return status, resp_headers
+
+    async def sleep_until(self, when: float):
+        delay = min(when, self.deadline) - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def load_schedule(self):
+        """Learn the slot boundaries the way the dashboard does"""
+        started = time.perf_counter()
+        status, headers, size, body = await self.api.get("/api/schedule-status", API_HEADERS, keep_body=True)
+        self.recorder.add("/api/schedule-status", time.perf_counter() - started, size, status < 400)
+        data = json.loads(decode_body(body, headers))
+        for item in data.get("playlist", []):
+            self.slot_offsets.append(parse_clock(item["at"]))
+        self.slot_offsets.sort()
+        if data.get("time_since_start_seconds") is not None:
+            # Relative schedule: `at` is an offset from the server's start time
+            self.server_start = time.monotonic() - data["time_since_start_seconds"]
+        elif data.get("current_time"):
+            # Absolute schedule: `at` is wall-clock time today, so count from the server's midnight
+            self.server_start = time.monotonic() - parse_clock(data["current_time"])
+
+    def next_boundary(self) -> Optional[float]:
+        if self.server_start is None:
+            return None
+        elapsed = time.monotonic() - self.server_start
+        for offset in self.slot_offsets:
+            if offset > elapsed:
+                return self.server_start + offset
+        return None
+
+    async def playback_loop(self):
+        while time.monotonic() < self.deadline:
+            result = await self.fetch(self.media, f"/next-video?_t={int(time.time() * 1000)}",
+                                      {"Cache-Control": "no-cache", "Pragma": "no-cache"})
+            content_type = result[1].get("content-type", "") if result else ""
+            if not result or "video" not in content_type:
+                # Placeholder or error: script.js re-asks after a short delay
+                await self.sleep_until(time.monotonic() + PLACEHOLDER_RETRY_SECONDS)
+                continue
+            boundary = self.next_boundary()
+            if boundary is None:
+                boundary = time.monotonic() + PLACEHOLDER_RETRY_SECONDS
+            # The clip plays until the slot ends, then the player waits ~1s before the next request
+            await self.sleep_until(boundary + VIDEO_END_DELAY_SECONDS * self.rng.uniform(0.5, 1.5))
+
+    async def status_loop(self):
+        await self.fetch(self.api, "/api/campaign-status", API_HEADERS)
+        await self.fetch(self.api, "/api/schedule-status", API_HEADERS)
+        await self.sleep_until(time.monotonic() + 0.5)
+        await self.fetch(self.api, "/api/current-video-id", API_HEADERS)
+        while True:
+            await self.sleep_until(time.monotonic() + STATUS_POLL_SECONDS)
+            if time.monotonic() >= self.deadline:
+                break
+            await self.fetch(self.api, "/api/campaign-status", API_HEADERS)
+            await self.fetch(self.api, "/api/schedule-status", API_HEADERS)
+            await self.fetch(self.api, "/api/current-video-id", API_HEADERS)
+            if self.rng.random() < self.dashboard_ratio:
+                await self.fetch(self.api, "/api/schedule-status", API_HEADERS)
+
+    async def run(self, start_delay: float):
+        await asyncio.sleep(start_delay)
+        try:
+            await self.load_schedule()
+        except Exception:
+            self.recorder.add("/api/schedule-status", 0.0, 0, False)
+        try:
+            await asyncio.gather(self.playback_loop(), self.status_loop())
+        finally:
+            await self.media.close()
+            await self.api.close()
+
+
+# ==== Rulare ====
+async def wait_until_ready(host: str, port: int, timeout: float = 30.0):
+    conn = HttpConnection(host, port)
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        try:
+            status, _, _, _ = await conn.get("/api/device/configured")
+            if status == 200:
+                await conn.close()
+                return
+        except OSError:
+            await conn.close()
+        await asyncio.sleep(0.2)
+    raise RuntimeError(f"Server on {host}:{port} did not become ready in {timeout}s")
+
+
+async def run_load(host: str, port: int, args) -> dict:
+    await wait_until_ready(host, port)
+    recorder = Recorder()
+    rng = random.Random(args.seed)
+    started = time.monotonic()
+    deadline = started + args.ramp + args.duration
+    players = [
+        SimulatedPlayer(i, host, port, recorder, deadline, args.dashboard_ratio, random.Random(rng.random()))
+        for i in range(args.players)
+    ]
+    await asyncio.gather(*(p.run(args.ramp * i / max(args.players, 1)) for i, p in enumerate(players)))
+    elapsed = time.monotonic() - started
+
+    endpoints = {name: stats.summary(elapsed) for name, stats in sorted(recorder.endpoints.items())}
+    total = EndpointStats()
+    for stats in recorder.endpoints.values():
+        total.latencies.extend(stats.latencies)
+        total.errors += stats.errors
+        total.bytes += stats.bytes
+    return {
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "elapsed_seconds": round(elapsed, 2),
+        "config": {k: v for k, v in vars(args).items() if k not in ("compare", "output")},
+        "endpoints": endpoints,
+        "total": total.summary(elapsed),
+    }
+
+
+def print_report(result: dict):
+    print(f"\n{'endpoint':<28}{'reqs':>8}{'rps':>9}{'err%':>7}{'p50':>9}{'p95':>9}{'p99':>9}{'MB':>10}")
+    rows = list(result["endpoints"].items()) + [("TOTAL", result["total"])]
+    for name, s in rows:
+        print(f"{name:<28}{s['requests']:>8}{s['throughput_rps']:>9}{s['error_rate'] * 100:>7.2f}"
+              f"{s['p50_ms'] or 0:>9}{s['p95_ms'] or 0:>9}{s['p99_ms'] or 0:>9}{s['bytes'] / 1e6:>10.1f}")
+
+
+def compare(old_path: Path, new_path: Path):
+    """Print throughput and latency deltas between two result files"""
+    with open(old_path, encoding="utf-8") as f:
+        old = json.load(f)
+    with open(new_path, encoding="utf-8") as f:
+        new = json.load(f)
+    print(f"{'endpoint':<28}{'metric':<16}{'old':>10}{'new':>10}{'delta%':>9}")
+    names = sorted(set(old["endpoints"]) | set(new["endpoints"])) + ["TOTAL"]
+    for name in names:
+        a = old["total"] if name == "TOTAL" else old["endpoints"].get(name, {})
+        b = new["total"] if name == "TOTAL" else new["endpoints"].get(name, {})
+        for metric in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms", "error_rate"):
+            x, y = a.get(metric), b.get(metric)
+            delta = f"{(y - x) / x * 100:+.1f}" if x and y is not None else "-"
+            print(f"{name:<28}{metric:<16}{str(x):>10}{str(y):>10}{delta:>9}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate many player screens against the app")
+    parser.add_argument("--target", help="Base URL of a running server (default: start a sandboxed one)")
+    parser.add_argument("--players", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=60.0, help="Seconds of steady load after ramp-up")
+    parser.add_argument("--ramp", type=float, default=5.0, help="Seconds over which players are started")
+    parser.add_argument("--slot-seconds", type=int, default=10, help="Slot length of the synthetic schedule")
+    parser.add_argument("--campaigns", type=int, default=4)
+    parser.add_argument("--fillers", type=int, default=6)
+    parser.add_argument("--media-kb", type=int, default=2048, help="Size of each synthetic MP4")
+    parser.add_argument("--dashboard-ratio", type=float, default=0.1,
+                        help="Chance per status poll that the dashboard is opened")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Result JSON path (default: loadtest_results/<timestamp>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="Compare two result files and exit")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.compare:
+        compare(Path(args.compare[0]), Path(args.compare[1]))
+        return
+
+    server = sandbox = None
+    if args.target:
+        url = urlsplit(args.target)
+        host, port = url.hostname, url.port or 80
+    else:
+        sandbox = prepare_sandbox(args)
+        host, port = "127.0.0.1", free_port()
+        server = start_server(sandbox, port)
+    try:
+        result = asyncio.run(run_load(host, port, args))
+    finally:
+        if server:
+            server.terminate()
+            server.wait(timeout=10)
+        if sandbox:
+            shutil.rmtree(sandbox, ignore_errors=True)
+
+    output = Path(args.output) if args.output else RESULTS_DIR / f"{datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+    print_report(result)
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
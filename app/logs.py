@@ -0,0 +1,269 @@
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+# ==== Setări implicite ====
+DEFAULT_LOG_LEVEL = "INFO"
+DEFAULT_HOT_PATH_LOG_LEVEL = "INFO"
+HOT_PATH_LOGGER_NAME = "hotpath"
+# uvicorn installs its own synchronous handlers on these; they are rerouted through the queue
+UVICORN_LOGGER_NAMES = ("uvicorn", "uvicorn.error", "uvicorn.access")
+
+# Identical messages (per slot) are let through at most RATE_LIMIT_BURST times
+# per RATE_LIMIT_WINDOW seconds; the rest are counted and reported once, either on
+# the next occurrence or in a summary record after the window expires.
+RATE_LIMIT_WINDOW = 60.0
+RATE_LIMIT_BURST = 1
+RATE_LIMIT_MAX_KEYS = 2048
+
+LOG_FILE_MAX_BYTES = 5 * 1024 * 1024
+LOG_FILE_BACKUPS = 3
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[logging.handlers.QueueHandler] = None
+_rate_limiter: Optional["SlotRateLimitFilter"] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Format log records as one JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        slot = getattr(record, "slot", None)
+        if slot is not None:
+            payload["slot"] = slot
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            payload["suppressed"] = suppressed
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Plain text formatter that still shows the slot and suppressed counters"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s:%(name)s:%(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        slot = getattr(record, "slot", None)
+        if slot is not None:
+            line += f" [slot={slot}]"
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            line += f" (+{suppressed} suppressed)"
+        return line
+
+
+class SlotRateLimitFilter(logging.Filter):
+    """Drop repeated messages per (logger, level, message, slot) within a time window.
+
+    Runs on the producer side of the queue so suppressed records are never
+    formatted or enqueued. The next record that passes for a key carries a
+    ``suppressed`` attribute with the number of dropped repeats. Keys whose
+    window expired without a repeat (or that are pruned or flushed) are
+    reported through ``sink`` as a summary record instead.
+    """
+
+    def __init__(self, window: float = RATE_LIMIT_WINDOW, burst: int = RATE_LIMIT_BURST,
+                 max_keys: int = RATE_LIMIT_MAX_KEYS,
+                 sink: Optional[Callable[[logging.LogRecord], None]] = None):
+        super().__init__()
+        self.window = window
+        self.burst = burst
+        self.max_keys = max_keys
+        self.sink = sink
+        # key -> [window_start, passed, suppressed]
+        self._seen: Dict[Tuple, list] = {}
+        self._last_sweep = time.monotonic()
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.window <= 0:
+            return True
+        key = (record.name, record.levelno, record.getMessage(), getattr(record, "slot", None))
+        now = time.monotonic()
+        with self._lock:
+            summaries = self._sweep(now) if now - self._last_sweep >= self.window else []
+            entry = self._seen.get(key)
+            if entry is None or now - entry[0] >= self.window:
+                suppressed = entry[2] if entry else 0
+                if entry is None and len(self._seen) >= self.max_keys:
+                    summaries += self._sweep(now)
+                    if len(self._seen) >= self.max_keys:
+                        summaries += self._sweep(now, everything=True)
+                self._seen[key] = [now, 1, 0]
+                if suppressed:
+                    record.suppressed = suppressed
+                passed = True
+            elif entry[1] < self.burst:
+                entry[1] += 1
+                passed = True
+            else:
+                entry[2] += 1
+                passed = False
+        # Outside the lock: the sink goes back through the handler
+        self._report(summaries)
+        return passed
+
+    def flush(self):
+        """Report every pending suppressed count (used on shutdown)"""
+        with self._lock:
+            summaries = self._sweep(time.monotonic(), everything=True)
+        self._report(summaries)
+
+    def _sweep(self, now: float, everything: bool = False) -> List[Tuple[Tuple, int]]:
+        """Drop expired keys (or all of them); return the suppressed counts they held"""
+        self._last_sweep = now
+        dropped = [k for k, v in self._seen.items() if everything or now - v[0] >= self.window]
+        summaries = []
+        for k in dropped:
+            suppressed = self._seen.pop(k)[2]
+            if suppressed:
+                summaries.append((k, suppressed))
+        return summaries
+
+    def _report(self, summaries: List[Tuple[Tuple, int]]):
+        if not self.sink:
+            return
+        for (name, levelno, msg, slot), suppressed in summaries:
+            self.sink(logging.makeLogRecord({
+                "name": name, "levelno": levelno, "levelname": logging.getLevelName(levelno),
+                "msg": msg, "slot": slot, "suppressed": suppressed,
+            }))
+
+
+class DeferredFormatQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves formatting to the listener thread.
+
+    The stock prepare() formats the record (traceback included) on the
+    calling thread; this one only merges the args into the message.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def _parse_level(level, default: str) -> int:
+    if isinstance(level, int):
+        return level
+    value = logging.getLevelName(str(level or default).upper())
+    return value if isinstance(value, int) else logging.getLevelName(default)
+
+
+def setup_logging(level=DEFAULT_LOG_LEVEL, hot_path_level=DEFAULT_HOT_PATH_LOG_LEVEL,
+                  json_output: bool = True, log_file: Optional[str] = None,
+                  rate_limit_window: float = RATE_LIMIT_WINDOW):
+    """Route all logging through a queue drained by a background thread.
+
+    Request threads only pay for the level check, the rate-limit lookup,
+    merging the message args and a queue put; formatting and I/O happen on
+    the listener thread.
+    """
+    global _listener, _queue_handler, _rate_limiter
+    shutdown_logging()
+
+    formatter = JsonFormatter() if json_output else TextFormatter()
+    handlers = []
+    stream_handler = logging.StreamHandler(sys.stderr)
+    stream_handler.setFormatter(formatter)
+    handlers.append(stream_handler)
+    if log_file:
+        file_handler = logging.handlers.RotatingFileHandler(
+            log_file, maxBytes=LOG_FILE_MAX_BYTES, backupCount=LOG_FILE_BACKUPS, encoding="utf-8"
+        )
+        file_handler.setFormatter(formatter)
+        handlers.append(file_handler)
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = DeferredFormatQueueHandler(log_queue)
+    # Summaries of suppressed repeats skip the filters (they would count as a new occurrence)
+    _rate_limiter = SlotRateLimitFilter(window=rate_limit_window,
+                                        sink=lambda r: queue_handler.enqueue(queue_handler.prepare(r)))
+    queue_handler.addFilter(_rate_limiter)
+    _queue_handler = queue_handler
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_queue_handler)
+    root.setLevel(_parse_level(level, DEFAULT_LOG_LEVEL))
+    set_hot_path_level(hot_path_level)
+    capture_uvicorn_loggers()
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+
+def set_hot_path_level(level):
+    """Set the verbosity of per-request logging independently of the rest"""
+    logging.getLogger(HOT_PATH_LOGGER_NAME).setLevel(_parse_level(level, DEFAULT_HOT_PATH_LOG_LEVEL))
+
+
+def capture_uvicorn_loggers(access_log: bool = True):
+    """Send uvicorn's loggers through the root queue handler instead of their own stream handlers.
+
+    uvicorn configures these after our module import when started via
+    uvicorn.run(), so this is applied again on app startup.
+    """
+    for name in UVICORN_LOGGER_NAMES:
+        uv_logger = logging.getLogger(name)
+        for handler in list(uv_logger.handlers):
+            uv_logger.removeHandler(handler)
+        uv_logger.propagate = True
+    logging.getLogger("uvicorn.access").disabled = not access_log
+
+
+def configure_from_config(cfg: dict):
+    """Apply logging options from config.json.
+
+    Keys: log_level, hot_path_log_level, log_json, log_file, log_rate_limit_seconds, access_log.
+    """
+    cfg = cfg or {}
+    keys = ("log_level", "hot_path_log_level", "log_json", "log_file", "log_rate_limit_seconds")
+    if any(k in cfg for k in keys):
+        setup_logging(
+            level=cfg.get("log_level", DEFAULT_LOG_LEVEL),
+            hot_path_level=cfg.get("hot_path_log_level", DEFAULT_HOT_PATH_LOG_LEVEL),
+            json_output=cfg.get("log_json", True),
+            log_file=cfg.get("log_file"),
+            rate_limit_window=float(cfg.get("log_rate_limit_seconds", RATE_LIMIT_WINDOW)),
+        )
+    capture_uvicorn_loggers(access_log=cfg.get("access_log", True))
+
+
+def shutdown_logging():
+    """Flush pending records and stop the background listener"""
+    global _listener, _queue_handler, _rate_limiter
+    if _rate_limiter is not None:
+        _rate_limiter.flush()
+        _rate_limiter = None
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _queue_handler = None
+
+
+atexit.register(shutdown_logging)
@@ -4,12 +4,20 @@ from fastapi.staticfiles import StaticFiles
 
 from core import (
     BASE_DIR,
+    MEDIA_HASH_CACHE_PATH,
+    QUARANTINE_DIR,
+    VIDEO_CAMPAIGN_DIR,
+    VIDEO_FILLER_DIR,
     ensure_directories,
     initialize_video_files,
+    load_config,
     logger
 )
+from logs import configure_from_config, shutdown_logging
 from services import ScheduleManager, VideoService
 from api import setup_routes
+from prewarm import PREWARM_LEAD_SECONDS, Prewarmer
+from integrity import MediaVerifier
 
 # Initialize FastAPI app
 app = FastAPI()
@@ -22,15 +30,25 @@ templates = Jinja2Templates(directory=str(BASE_DIR / "templates"))
 
 # Initialize services
 schedule_manager = ScheduleManager()
-video_service = VideoService(schedule_manager)
+verifier = MediaVerifier(
+    [VIDEO_CAMPAIGN_DIR, VIDEO_FILLER_DIR],
+    cache_path=MEDIA_HASH_CACHE_PATH,
+    quarantine_dir=QUARANTINE_DIR,
+    expected_hashes=schedule_manager.get_expected_hashes,
+)
+video_service = VideoService(schedule_manager, verifier)
+prewarmer = Prewarmer(schedule_manager, video_service)
 
 # Setup API routes
-setup_routes(app, schedule_manager, video_service)
+setup_routes(app, schedule_manager, video_service, prewarmer, verifier)
 
 
 @app.on_event("startup")
 async def startup_event():
     """Initialize application on startup"""
+    # Apply logging options from config.json
+    configure_from_config(load_config())
+
     # Ensure directories exist
     ensure_directories()
     
@@ -40,10 +58,28 @@ async def startup_event():
     # Load initial schedule and campaigns
     schedule_manager.load_campaigns()
     schedule_manager.load_schedule()
+
+    # Verify media in the background; bad files are quarantined unless disabled in config.json
+    if not load_config().get("quarantine_bad_media", True):
+        verifier.quarantine_dir = None
+    verifier.start()
+
+    # Start warming upcoming media into the page cache
+    prewarmer.lead_seconds = float(load_config().get("prewarm_lead_seconds", PREWARM_LEAD_SECONDS))
+    prewarmer.start()
     
     logger.info("Application initialized successfully")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background workers, persist filler rotation and flush queued log records before exit"""
+    prewarmer.stop()
+    verifier.stop()
+    video_service.filler_rotation.save_state()
+    shutdown_logging()
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
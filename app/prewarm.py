@@ -0,0 +1,194 @@
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Optional
+
+from fastapi.responses import FileResponse
+
+from core import logger
+
+# ==== Setări implicite ====
+PREWARM_LEAD_SECONDS = 5.0
+PREWARM_INTERVAL_SECONDS = 1.0
+# Bytes read synchronously from the start of the file so the first chunk is resident
+PREWARM_HEAD_BYTES = 4 * 1024 * 1024
+PREWARM_READ_CHUNK = 1024 * 1024
+# A file counts as warm for this long after it was prewarmed
+WARM_TTL_SECONDS = 600.0
+
+
+class FirstByteStats:
+    """Cold vs warm time-to-first-byte counters per served item"""
+
+    def __init__(self):
+        self._stats: Dict[str, Dict[str, list]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, key: str, warm: bool, seconds: float):
+        bucket = "warm" if warm else "cold"
+        with self._lock:
+            item = self._stats.setdefault(key, {"cold": [0, 0.0, 0.0], "warm": [0, 0.0, 0.0]})
+            counter = item[bucket]
+            counter[0] += 1
+            counter[1] += seconds
+            counter[2] = max(counter[2], seconds)
+
+    def snapshot(self) -> dict:
+        def summary(counter):
+            count, total, peak = counter
+            return {
+                "count": count,
+                "avg_ms": round(total / count * 1000, 2) if count else None,
+                "max_ms": round(peak * 1000, 2) if count else None,
+            }
+
+        with self._lock:
+            items = {key: {bucket: summary(c) for bucket, c in item.items()} for key, item in self._stats.items()}
+            totals = {"cold": [0, 0.0, 0.0], "warm": [0, 0.0, 0.0]}
+            for item in self._stats.values():
+                for bucket, (count, total, peak) in item.items():
+                    totals[bucket][0] += count
+                    totals[bucket][1] += total
+                    totals[bucket][2] = max(totals[bucket][2], peak)
+        return {"items": items, "totals": {bucket: summary(c) for bucket, c in totals.items()}}
+
+
+first_byte_stats = FirstByteStats()
+
+
+class TimedFileResponse(FileResponse):
+    """FileResponse that records time-to-first-byte in first_byte_stats.
+
+    Uses larger chunks than the default so big MP4s need fewer read/send
+    round trips; servers that support the ASGI pathsend extension still get
+    the zero-copy path from FileResponse itself. Those responses are not
+    recorded, since handing over the path says nothing about the first byte.
+    """
+
+    chunk_size = 256 * 1024
+
+    def __init__(self, path, *args, started: float, warm: bool = False, **kwargs):
+        super().__init__(path, *args, **kwargs)
+        self.started = started
+        self.warm = warm
+        self.stats_key = Path(path).name
+
+    async def __call__(self, scope, receive, send):
+        recorded = False
+
+        async def timed_send(message):
+            nonlocal recorded
+            if not recorded and message["type"] == "http.response.pathsend":
+                recorded = True
+            elif not recorded and message["type"] == "http.response.body":
+                recorded = True
+                first_byte_stats.record(self.stats_key, self.warm, time.perf_counter() - self.started)
+            await send(message)
+
+        await super().__call__(scope, receive, timed_send)
+
+
+def warm_file(path: Path) -> bool:
+    """Ask the kernel to pull a file into the page cache"""
+    try:
+        with open(path, 'rb', buffering=0) as f:
+            if hasattr(os, 'posix_fadvise'):
+                os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_WILLNEED)
+                limit = PREWARM_HEAD_BYTES
+            else:
+                limit = None
+            # WILLNEED is asynchronous; read the head so the first chunk is resident
+            read = 0
+            while limit is None or read < limit:
+                chunk = f.read(PREWARM_READ_CHUNK)
+                if not chunk:
+                    break
+                read += len(chunk)
+        return True
+    except OSError as e:
+        logger.warning(f"[PREWARM] Could not warm {path}: {e}")
+        return False
+
+
+class Prewarmer:
+    """Background thread that warms the media of upcoming slots ahead of time"""
+
+    def __init__(self, schedule_manager, video_service, lead_seconds: float = PREWARM_LEAD_SECONDS,
+                 interval: float = PREWARM_INTERVAL_SECONDS):
+        self.schedule_manager = schedule_manager
+        self.video_service = video_service
+        self.lead_seconds = lead_seconds
+        self.interval = interval
+        self.warmed: Dict[str, float] = {}
+        self._done: Dict[tuple, datetime] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="prewarmer", daemon=True)
+        self._thread.start()
+        logger.info(f"[PREWARM] Started with {self.lead_seconds}s lead time")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.tick()
+            except Exception as e:
+                logger.error(f"[PREWARM] Tick failed: {e}")
+
+    def tick(self, now: Optional[datetime] = None):
+        """Warm every slot that starts within the lead time (or is already running)"""
+        if not self.schedule_manager.is_schedule_for_today():
+            return
+        now = now or datetime.now()
+        horizon = now + timedelta(seconds=self.lead_seconds)
+        for start_dt, end_dt, item in self.schedule_manager.compile_playlist():
+            if start_dt > horizon or end_dt <= now:
+                continue
+            path = self.video_service.resolve_media_path(item)
+            if not path:
+                continue
+            key = (str(path), start_dt)
+            if key in self._done:
+                continue
+            self._done[key] = end_dt
+            if warm_file(path):
+                with self._lock:
+                    self.warmed[str(path)] = time.monotonic()
+                logger.debug(f"[PREWARM] {path.name} for slot {item.get('at')}")
+
+        # Forget slots that are over and files that went cold
+        for key in [k for k, end in self._done.items() if end <= now]:
+            del self._done[key]
+        with self._lock:
+            cutoff = time.monotonic() - WARM_TTL_SECONDS
+            for p in [p for p, t in self.warmed.items() if t < cutoff]:
+                del self.warmed[p]
+
+    def is_warm(self, path: Path) -> bool:
+        with self._lock:
+            warmed_at = self.warmed.get(str(path))
+        return warmed_at is not None and time.monotonic() - warmed_at < WARM_TTL_SECONDS
+
+    def status(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            warm = sorted(Path(p).name for p, t in self.warmed.items() if now - t < WARM_TTL_SECONDS)
+        return {
+            "running": bool(self._thread and self._thread.is_alive()),
+            "lead_seconds": self.lead_seconds,
+            "warm_files": warm,
+            "first_byte": first_byte_stats.snapshot(),
+        }
@@ -1,33 +1,57 @@
 import json
 from datetime import datetime, time, timedelta
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
 from pathlib import Path
 
 from core import (
     logger,
+    hot_logger,
     CAMPAIGN_JSON_PATH,
     SCHEDULE_JSON_PATH,
     VIDEO_CAMPAIGN_DIR,
     VIDEO_FILLER_DIR,
     PLACEHOLDER_IMAGE_PATH,
+    FILLER_STATE_PATH,
     campaign_plays_today,
     campaign_plays_hour,
     reset_hourly_counters,
     reset_daily_counters
 )
+from fillers import FillerRotation
+from integrity import MediaVerifier
 
 
 class ScheduleManager:
     def __init__(self):
         self.start_time = None
+        self.current_slot_end: Optional[datetime] = None
         self.campaigns = {}
         self.schedule = {}
+        # Bumped on every (re)load so derived data and cached responses can be reused until then
+        self.version = 0
+        self._file_mtimes: Dict[Path, Optional[int]] = {}
+        # (key, playlist) replaced in one assignment so concurrent readers never see a mixed pair
+        self._compiled: Tuple[Optional[tuple], List[Tuple[datetime, datetime, dict]]] = (None, [])
         self.load_campaigns()
         self.load_schedule()
 
-    
+    @staticmethod
+    def _mtime(path: Path) -> Optional[int]:
+        try:
+            return path.stat().st_mtime_ns
+        except OSError:
+            return None
+
+    def reload_if_changed(self):
+        """Reload campaigns.json / schedule.json only if they changed on disk"""
+        if self._mtime(CAMPAIGN_JSON_PATH) != self._file_mtimes.get(CAMPAIGN_JSON_PATH):
+            self.load_campaigns()
+        if self._mtime(SCHEDULE_JSON_PATH) != self._file_mtimes.get(SCHEDULE_JSON_PATH):
+            self.load_schedule()
+
     def load_campaigns(self):
         """Load campaigns from JSON file"""
+        self._file_mtimes[CAMPAIGN_JSON_PATH] = self._mtime(CAMPAIGN_JSON_PATH)
         try:
             if CAMPAIGN_JSON_PATH.exists():
                 with open(CAMPAIGN_JSON_PATH, 'r', encoding='utf-8') as f:
@@ -44,9 +68,13 @@ class ScheduleManager:
         except Exception as e:
             logger.error(f"Error loading campaigns: {e}")
             self.campaigns = {}
+        # Bump only after the new data is in place, so a concurrent compile can never
+        # cache the old playlist under the new version
+        self.version += 1
     
     def load_schedule(self):
         """Load schedule from JSON file"""
+        self._file_mtimes[SCHEDULE_JSON_PATH] = self._mtime(SCHEDULE_JSON_PATH)
         try:
             if SCHEDULE_JSON_PATH.exists():
                 with open(SCHEDULE_JSON_PATH, 'r', encoding='utf-8') as f:
@@ -66,6 +94,7 @@ class ScheduleManager:
         except Exception as e:
             logger.error(f"Error loading schedule: {e}")
             self.schedule = {}
+        self.version += 1
 
     
     # ScheduleManager  – acceptă și YYYY-MM-DD
@@ -88,17 +117,21 @@ class ScheduleManager:
         return schedule_date == datetime.now().date()
 
     
-    def get_current_scheduled_item(self) -> Optional[Tuple[dict, dict]]:
-        """Get the currently scheduled item based on current time"""
-        if not self.is_schedule_for_today():
-            logger.info("No valid schedule for today")
-            return None
-        
+    def compile_playlist(self) -> List[Tuple[datetime, datetime, dict]]:
+        """Resolve playlist entries to (start, end, item) for today; cached until the next reload"""
         now = datetime.now()
-        relative = self.schedule.get("relative", False)
+        # Read the version before the schedule: a reload in between then only makes the
+        # cached result newer than its key, never older
+        version = self.version
+        schedule = self.schedule
+        relative = schedule.get("relative", False)
+        key = (version, self.start_time if relative else now.date())
+        compiled_key, compiled = self._compiled
+        if key == compiled_key:
+            return compiled
         sorted_playlist = []
 
-        for item in self.schedule.get('playlist', []):
+        for item in schedule.get('playlist', []):
             try:
                 offset_time = datetime.strptime(item['at'], "%H:%M:%S")
                 duration = item.get("duration", 30)
@@ -114,22 +147,95 @@ class ScheduleManager:
                 end_dt = start_dt + timedelta(seconds=duration)
                 sorted_playlist.append((start_dt, end_dt, item))
             except Exception as e:
-                logger.warning(f"Invalid time in playlist item {item.get('at')}: {e}")
-        
+                logger.warning(f"Invalid time in playlist item {item.get('at')}: {e}",
+                               extra={"slot": item.get('at')})
+        self._compiled = (key, sorted_playlist)
+        return sorted_playlist
+
+    def get_current_scheduled_item(self) -> Optional[Tuple[dict, dict]]:
+        """Get the currently scheduled item based on current time"""
+        if not self.is_schedule_for_today():
+            hot_logger.info("No valid schedule for today")
+            return None
+
+        now = datetime.now()
+        sorted_playlist = self.compile_playlist()
+
         for start_dt, end_dt, item in sorted_playlist:
             if start_dt <= now < end_dt:
                 item_id = item.get('id')
                 item_type = item.get('type', 'filler')
                 if item_type == 'campaign' and item_id in self.campaigns:
-                    logger.info(f"[RELATIVE] Scheduled campaign active: {item_id}")
+                    hot_logger.info(f"[RELATIVE] Scheduled campaign active: {item_id}",
+                                    extra={"slot": item.get('at')})
+                    self.current_slot_end = end_dt
                     return item, self.campaigns[item_id]
                 elif item_type == 'filler':
-                    logger.info(f"[RELATIVE] Scheduled filler active: {item_id}")
+                    hot_logger.info(f"[RELATIVE] Scheduled filler active: {item_id}",
+                                    extra={"slot": item.get('at')})
+                    self.current_slot_end = end_dt
                     return item, None
 
-        
+        self.current_slot_end = None
         return None
+
+    def get_remaining_slot_seconds(self) -> Optional[float]:
+        """Seconds left in the slot returned by the last get_current_scheduled_item() call"""
+        if not self.current_slot_end:
+            return None
+        return max(0.0, (self.current_slot_end - datetime.now()).total_seconds())
     
+    def get_compact_status(self) -> Tuple[tuple, Callable[[], dict]]:
+        """Columnar schedule status: (cache key, payload builder).
+
+        Slot times are integer second offsets from `base` (start time in relative
+        mode, local midnight otherwise) and per-slot status is left to the client,
+        so the body only changes when the schedule is reloaded or the current slot
+        changes and can be shared by every screen in the meantime.
+        """
+        valid = self.is_schedule_for_today()
+        compiled = sorted(self.compile_playlist(), key=lambda x: x[0]) if valid else []
+        now = datetime.now()
+        current = next((i for i, (start, end, _) in enumerate(compiled) if start <= now < end), None)
+        key = (self.version, valid, self.start_time, now.date(), current)
+
+        def build():
+            if self.schedule.get("relative", False) and self.start_time:
+                base = self.start_time.replace(microsecond=0)
+            else:
+                base = datetime.combine(now.date(), time.min)
+            columns = {"id": [], "name": [], "type": [], "at": [], "duration": []}
+            for start, end, item in compiled:
+                item_id = item.get('id')
+                name = item_id
+                if item.get('type') == 'campaign' and item_id in self.campaigns:
+                    name = self.campaigns[item_id].get('name', item_id)
+                columns["id"].append(item_id)
+                columns["name"].append(name)
+                columns["type"].append(item.get('type', 'filler'))
+                columns["at"].append(int((start - base).total_seconds()))
+                columns["duration"].append(int((end - start).total_seconds()))
+            return {
+                "v": 1,
+                "schedule_date": self.schedule.get('date', 'N/A'),
+                "is_valid_for_today": valid,
+                "relative": self.schedule.get("relative", False),
+                "timezone": self.schedule.get('timezone', 'Europe/Bucharest'),
+                "base": int(base.timestamp()),
+                "current": current,
+                **columns,
+            }
+
+        return key, build
+
+    def get_expected_hashes(self) -> Dict[str, str]:
+        """SHA-256 checksums declared in campaigns.json (video_sha256), keyed by file name"""
+        return {
+            item['video_file']: item['video_sha256']
+            for item in self.campaigns.values()
+            if item.get('video_file') and item.get('video_sha256')
+        }
+
     def get_next_scheduled_item_time(self) -> Optional[datetime]:
         """Get the time when the next scheduled item starts"""
         if not self.is_schedule_for_today():
@@ -147,7 +253,8 @@ class ScheduleManager:
                     next_datetime = datetime.combine(datetime.now().date(), item_time)
                     next_times.append(next_datetime)
             except Exception as e:
-                logger.warning(f"Invalid time format in playlist item: {item.get('at')} - {e}")
+                logger.warning(f"Invalid time format in playlist item: {item.get('at')} - {e}",
+                               extra={"slot": item.get('at')})
                 continue
         
         if next_times:
@@ -206,7 +313,7 @@ class ScheduleManager:
 
                 enhanced_playlist.append(enhanced_item)
             except Exception as e:
-                logger.warning(f"Error processing playlist item: {e}")
+                logger.warning(f"Error processing playlist item: {e}", extra={"slot": item.get('at')})
                 continue
         
         # Sort by time
@@ -215,12 +322,13 @@ class ScheduleManager:
 
 
 class VideoService:
-    def __init__(self, schedule_manager: ScheduleManager):
+    def __init__(self, schedule_manager: ScheduleManager, verifier: Optional[MediaVerifier] = None):
         self.schedule_manager = schedule_manager
+        self.verifier = verifier
         self.current_video_path = None
         self.current_video_type = None
         self.last_served_video = None
-        self.current_video_index = 0
+        self.filler_rotation = FillerRotation(VIDEO_FILLER_DIR, state_path=FILLER_STATE_PATH)
 
     def get_next_video(self):
         """Get the next video based on schedule and availability"""
@@ -233,12 +341,17 @@ class VideoService:
             scheduled_item, campaign_info = scheduled_result
             item_type = scheduled_item.get('type', 'filler')
             item_id = scheduled_item.get('id')
+            slot = scheduled_item.get('at')
 
             # === CAMPAIGN VIDEO ===
             if item_type == 'campaign' and campaign_info:
                 video_file = campaign_info.get('video_file')
                 if video_file:
                     video_path = VIDEO_CAMPAIGN_DIR / video_file
+                    if self._is_bad(video_path):
+                        logger.warning(f"[BAD-CAMPAIGN] {video_file} failed verification → using filler",
+                                       extra={"slot": slot})
+                        return self._serve_fallback_filler(f"Corrupt campaign video: {video_file}", slot)
                     if video_path.exists():
                         self.current_video_path = video_path
                         self.current_video_type = 'campaign'
@@ -253,48 +366,71 @@ class VideoService:
                             campaign_plays_hour[campaign_id] = campaign_plays_hour.get(campaign_id, 0) + 1
                             campaign_plays_today[campaign_id] = campaign_plays_today.get(campaign_id, 0) + 1
 
-                        logger.info(f"[SCHEDULED-CAMPAIGN] {self.current_video_path.name}")
+                        hot_logger.info(f"[SCHEDULED-CAMPAIGN] {self.current_video_path.name}", extra={"slot": slot})
                         return self.current_video_path, 'campaign'
                     else:
-                        logger.warning(f"[MISSING-CAMPAIGN] Video not found: {video_file} → using placeholder")
+                        logger.warning(f"[MISSING-CAMPAIGN] Video not found: {video_file} → using placeholder",
+                                       extra={"slot": slot})
                         return self._serve_placeholder(f"Missing campaign video: {video_file}")
 
             # === FILLER VIDEO ===
             elif item_type == 'filler':
-                filler_files = list(VIDEO_FILLER_DIR.glob("*.mp4"))
+                self.filler_rotation.refresh(self.schedule_manager.campaigns)
 
-                for filler_file in filler_files:
-                    if filler_file.stem == item_id or filler_file.name == f"{item_id}.mp4":
-                        self.current_video_path = filler_file
-                        self.current_video_type = 'filler'
-                        self.last_served_video = {
-                            "path": filler_file,
-                            "type": 'filler',
-                            "info": {'id': item_id, 'scheduled': True}
-                        }
-                        logger.info(f"[SCHEDULED-FILLER] {self.current_video_path.name}")
-                        return self.current_video_path, 'filler'
-
-                # Filler missing: try any other filler
-                if filler_files:
-                    filler_file = filler_files[self.current_video_index % len(filler_files)]
-                    self.current_video_index = (self.current_video_index + 1) % len(filler_files)
+                filler_file = self.filler_rotation.find(item_id) if item_id else None
+                if filler_file and not self._is_bad(filler_file):
+                    self.filler_rotation.mark_played(filler_file)
                     self.current_video_path = filler_file
                     self.current_video_type = 'filler'
                     self.last_served_video = {
                         "path": filler_file,
                         "type": 'filler',
-                        "info": {'scheduled': False, 'fallback': True, 'message': f"Missing filler: {item_id}.mp4"}
+                        "info": {'id': item_id, 'scheduled': True}
                     }
-                    logger.warning(f"[FILLER-FALLBACK] {item_id}.mp4 missing → using {filler_file.name}")
+                    hot_logger.info(f"[SCHEDULED-FILLER] {self.current_video_path.name}", extra={"slot": slot})
                     return self.current_video_path, 'filler'
-                else:
-                    logger.warning(f"[NO-FILLERS] Filler '{item_id}' not found and no fillers available → placeholder")
-                    return self._serve_placeholder(f"Missing filler and no alternatives: {item_id}.mp4")
+
+                # Filler missing or corrupt: pick the next filler from the rotation
+                problem = "Corrupt" if filler_file else "Missing"
+                return self._serve_fallback_filler(f"{problem} filler: {item_id}.mp4", slot)
 
         # No scheduled item – fallback
         return self._serve_placeholder("No scheduled content at this time")
 
+    def _is_bad(self, path: Path) -> bool:
+        return bool(self.verifier and self.verifier.is_bad(path))
+
+    def _serve_fallback_filler(self, message: str, slot=None):
+        self.filler_rotation.refresh(self.schedule_manager.campaigns)
+        filler_file = self.filler_rotation.pick(self.schedule_manager.get_remaining_slot_seconds(),
+                                                skip=self._is_bad)
+        if filler_file:
+            self.current_video_path = filler_file
+            self.current_video_type = 'filler'
+            self.last_served_video = {
+                "path": filler_file,
+                "type": 'filler',
+                "info": {'scheduled': False, 'fallback': True, 'message': message}
+            }
+            logger.warning(f"[FILLER-FALLBACK] {message} → using {filler_file.name}", extra={"slot": slot})
+            return self.current_video_path, 'filler'
+        logger.warning(f"[NO-FILLERS] {message} and no fillers available → placeholder", extra={"slot": slot})
+        return self._serve_placeholder(f"{message} and no alternatives")
+
+    def resolve_media_path(self, item: dict) -> Optional[Path]:
+        """Path of the file that would be served for a playlist item, if it exists"""
+        item_id = item.get('id')
+        if item.get('type', 'filler') == 'campaign':
+            campaign = self.schedule_manager.campaigns.get(item_id)
+            video_file = campaign.get('video_file') if campaign else None
+            if video_file:
+                video_path = VIDEO_CAMPAIGN_DIR / video_file
+                return video_path if video_path.exists() and not self._is_bad(video_path) else None
+            return None
+        self.filler_rotation.refresh(self.schedule_manager.campaigns)
+        filler_file = self.filler_rotation.find(item_id) if item_id else None
+        return filler_file if filler_file and not self._is_bad(filler_file) else None
+
     def _serve_placeholder(self, message="No content available"):
         if PLACEHOLDER_IMAGE_PATH.exists():
             self.current_video_type = "placeholder"
@@ -303,7 +439,7 @@ class VideoService:
                 "type": "placeholder",
                 "info": {"message": message}
             }
-            logger.info(f"[PLACEHOLDER] {message}")
+            hot_logger.info(f"[PLACEHOLDER] {message}")
             return PLACEHOLDER_IMAGE_PATH, 'placeholder'
         else:
             logger.error("[FATAL] No placeholder image found")
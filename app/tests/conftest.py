@@ -0,0 +1,16 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# The app is run from app/ and imports its modules top-level (from core import ...)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import logs  # noqa: E402
+
+
+@pytest.fixture(autouse=True, scope="session")
+def flush_logging():
+    yield
+    # Report pending rate-limit summaries while the captured stderr is still open
+    logs.shutdown_logging()
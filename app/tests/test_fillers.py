@@ -0,0 +1,58 @@
+from collections import Counter
+
+from fillers import FillerRotation
+
+
+def make_rotation(tmp_path, weights, durations=None):
+    durations = durations or {}
+    for name in weights:
+        (tmp_path / f"{name}.mp4").write_bytes(b"")
+    campaigns = {
+        name: {"file_type": "filler", "weight": weight, "duration": durations.get(name)}
+        for name, weight in weights.items()
+    }
+    rotation = FillerRotation(tmp_path)
+    rotation.refresh(campaigns)
+    return rotation
+
+
+def test_share_follows_weight(tmp_path):
+    rotation = make_rotation(tmp_path, {"heavy": 3, "a": 1, "b": 1, "c": 1})
+    plays = Counter(rotation.pick().stem for _ in range(600))
+    expected = {"heavy": 300, "a": 100, "b": 100, "c": 100}
+    # Exact up to where the 600th pick falls within a round
+    assert all(abs(plays[name] - count) <= 1 for name, count in expected.items())
+
+
+def test_never_back_to_back(tmp_path):
+    rotation = make_rotation(tmp_path, {"heavy": 10, "light": 1})
+    picks = [rotation.pick().stem for _ in range(200)]
+    assert all(prev != cur for prev, cur in zip(picks, picks[1:]))
+
+
+def test_duration_fit_with_string_duration(tmp_path):
+    rotation = make_rotation(tmp_path, {"short": 1, "long": 1, "broken": 1},
+                             durations={"short": "10", "long": 60, "broken": "n/a"})
+    assert rotation.entries["short.mp4"].duration == 10.0
+    assert rotation.entries["broken.mp4"].duration is None
+    assert rotation.pick(remaining=15).stem == "short"
+
+
+def test_invalid_weights_are_ignored(tmp_path):
+    rotation = make_rotation(tmp_path, {"ok": 1, "inf": float("inf"), "nan": float("nan"), "zero": 0})
+    assert set(rotation.entries) == {"ok.mp4"}
+
+
+def test_state_survives_restart(tmp_path):
+    state = tmp_path / "state.json"
+    media = tmp_path / "media"
+    media.mkdir()
+    rotation = make_rotation(media, {"a": 1, "b": 1})
+    rotation.state_path = state
+    first = rotation.pick()
+    rotation.save_state()
+
+    restored = FillerRotation(media, state_path=state)
+    restored.refresh({})
+    assert restored.last_played == first.name
+    assert restored.pick() != first